@@ -1,12 +1,24 @@
 import os
 import sys
+import json
+import sqlite3
 import hashlib
 import socket
 import platform
+import functools
+import mimetypes
+import threading
 import argparse
+import tempfile
 import webbrowser
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 import io
+import pathlib
+import mmap
+import itertools
+from collections import deque
+from contextlib import closing
 
 # 導入 rich 相關的模組
 from rich.console import Console
@@ -14,16 +26,14 @@ from rich.panel import Panel
 from rich.text import Text
 from rich.table import Table
 
-# 導入 Google API 相關模組
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
-from googleapiclient.errors import HttpError
+# Google API 相關模組較重，延遲到首次使用時才在各函數內導入，
+# 使參數解析與路徑檢查等提前退出的情況不必承擔其導入開銷
 
 # --- 常數定義 ---
 SCOPES = ['https://www.googleapis.com/auth/drive']
+PLATFORM_SYSTEM = platform.system()
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+FOLDER_QUERY = f"mimeType = '{FOLDER_MIME_TYPE}' and trashed = false"
 MIME_TYPE_MAP = {
     'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'application/vnd.google-apps.document',
     'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'application/vnd.google-apps.spreadsheet',
@@ -31,95 +41,616 @@ MIME_TYPE_MAP = {
     'text/plain': 'application/vnd.google-apps.document',
     'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'application/vnd.google-apps.presentation',
 }
+# 可轉換格式的副檔名直接查表，不必經過 mimetypes 模組（首次調用時會讀取系統的 mime.types）
+EXT_TO_MIME_TYPE = {
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.csv': 'text/csv',
+    '.txt': 'text/plain',
+    '.pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
 GOOGLE_DOC_EXPORT_MAP = {
     'application/vnd.google-apps.document': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
     'application/vnd.google-apps.spreadsheet': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
     'application/vnd.google-apps.presentation': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
 }
+HASH_CACHE_FILENAME = 'hashcache.db'
+FOLDER_CACHE_FILENAME = 'folder_ids.json'
+MD5_READ_BLOCK_SIZE = 1 << 20
+PIPELINED_MD5_MIN_BYTES = 100 * 1024 * 1024
+PIPELINED_MD5_WINDOW = 8 << 20
+PIPELINED_MD5_READERS = 4
+TREE_HASH_SEGMENT_SIZE = 64 << 20
+DOWNLOAD_BLOCK_SIZE = 8 << 20
+DOWNLOAD_TIMEOUT = (10, 60)
+DEFAULT_UPLOAD_CHUNK_SIZE_MB = 32
+SIMPLE_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
 
 # --- 輔助函數 ---
 
+def print_error(console, renderable):
+    # --quiet 模式下一般輸出被抑制，錯誤與警告仍需輸出到 stderr
+    if console.quiet:
+        Console(stderr=True).print(renderable)
+    else:
+        console.print(renderable)
+
+def load_json_cache(cache_path):
+    try:
+        with open(cache_path, 'r') as cache_file:
+            data = json.load(cache_file)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_json_cache(cache_path, data):
+    # 先寫入臨時文件再 os.replace，避免中途中斷留下損壞的緩存
+    tmp_path = cache_path + '.tmp'
+    try:
+        with open(tmp_path, 'w') as cache_file:
+            json.dump(data, cache_file)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
 def get_drive_service(credentials_path, token_path, console):
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+
     creds = None
     if os.path.exists(token_path):
         creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+    # 只有令牌確實被刷新或重新授權後才寫回 token.json
+    token_changed = False
+    if creds and not creds.valid and creds.expired and creds.refresh_token:
+        creds.refresh(Request())
+        token_changed = True
     if not creds or not creds.valid:
+        # 僅在需要用戶於瀏覽器中授權時顯示提示
         with console.status("[bold yellow]需要授權，請在瀏覽器中操作...", spinner="dots"):
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if not os.path.exists(credentials_path):
-                    console.print(f"[bold red]錯誤:[/bold red] 憑證文件未找到 -> '{credentials_path}'")
-                    sys.exit(1)
-                flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
-                creds = flow.run_local_server(port=0)
-            with open(token_path, 'w') as token_file:
+            if not os.path.exists(credentials_path):
+                print_error(console, f"[bold red]錯誤:[/bold red] 憑證文件未找到 -> '{credentials_path}'")
+                sys.exit(1)
+            flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
+            creds = flow.run_local_server(port=0)
+        token_changed = True
+    if token_changed:
+        # mkstemp 以 0600 權限創建唯一的臨時文件：刷新令牌不會變成他人可讀，並發執行也不會爭用同一個臨時文件名
+        fd, tmp_token_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(token_path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as token_file:
                 token_file.write(creds.to_json())
-    return build('drive', 'v3', credentials=creds)
-
-def calculate_md5(file_path):
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
-
-def get_or_create_folder_id(service, folder_name, console, parent_id='root'):
-    query = f"name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder' and '{parent_id}' in parents and trashed = false"
-    response = service.files().list(q=query, spaces='drive', fields='files(id)').execute()
-    files = response.get('files', [])
-    if files: return files[0].get('id')
-    folder_metadata = {'name': folder_name, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [parent_id]}
+            os.replace(tmp_token_path, token_path)
+        except BaseException:
+            if os.path.exists(tmp_token_path): os.remove(tmp_token_path)
+            raise
+    # 使用客戶端庫內置的 Discovery 文檔構建服務，無需獲取文檔的 HTTPS 往返
+    return build('drive', 'v3', credentials=creds, static_discovery=True)
+
+def new_md5():
+    # MD5 僅用於與 Drive 的 md5Checksum 比對完整性；usedforsecurity=False 可避開 FIPS 模式的限制與檢查開銷
+    try:
+        return hashlib.md5(usedforsecurity=False)
+    except TypeError:
+        return hashlib.md5()
+
+def open_sequential(file_path):
+    # O_SEQUENTIAL (Windows) / POSIX_FADV_SEQUENTIAL (Linux) 提示內核進行順序預讀
+    flags = os.O_RDONLY | getattr(os, 'O_BINARY', 0) | getattr(os, 'O_SEQUENTIAL', 0)
+    fd = os.open(file_path, flags)
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+    return fd
+
+def hash_file_md5_pipelined(file_path, file_size, cancel_event=None):
+    # MD5 本身無法並行，但可由多個線程預讀後續窗口，單一線程按順序更新，讓磁碟讀取與哈希計算重疊；
+    # 讀取線程把窗口填入循環使用的預分配緩衝區 (比在途窗口多一個，供哈希當前窗口時提交下一次讀取)，
+    # 不必為每個窗口分配新的 bytes。不支持 preadv 的平台從 mmap 複製，使缺頁讀盤仍發生在讀取線程中
+    hash_md5 = new_md5()
+    fd = open_sequential(file_path)
+    mm = mm_view = None
+    try:
+        if not hasattr(os, 'preadv'):
+            mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            mm_view = memoryview(mm)
+        buffers = deque(bytearray(PIPELINED_MD5_WINDOW) for _ in range(PIPELINED_MD5_READERS + 1))
+        def read_window(offset, buf):
+            view = memoryview(buf)
+            size = min(PIPELINED_MD5_WINDOW, file_size - offset)
+            if mm_view is not None:
+                with mm_view[offset:offset + size] as window:
+                    filled = len(window)
+                    view[:filled] = window
+                return view[:filled]
+            # preadv 可能返回不足一個窗口的數據，須讀滿窗口或直到文件結尾，否則摘要錯誤並被寫入緩存
+            filled = 0
+            while filled < size:
+                n = os.preadv(fd, [view[filled:size]], offset + filled)
+                if n == 0: break
+                filled += n
+            return view[:filled]
+        offsets = iter(range(0, file_size, PIPELINED_MD5_WINDOW))
+        # 最多同時保留 PIPELINED_MD5_READERS 個已提交的窗口，限制內存佔用
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=PIPELINED_MD5_READERS) as pool:
+            def submit(offset):
+                buf = buffers.popleft()
+                pending.append((pool.submit(read_window, offset, buf), buf))
+            for offset in itertools.islice(offsets, PIPELINED_MD5_READERS):
+                submit(offset)
+            while pending:
+                future, buf = pending.popleft()
+                data = future.result()
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    submit(next_offset)
+                if cancel_event is not None and cancel_event.is_set():
+                    for pending_future, _ in pending: pending_future.cancel()
+                    return None
+                hash_md5.update(data)
+                buffers.append(buf)
+        return hash_md5.hexdigest()
+    finally:
+        if mm_view is not None: mm_view.release()
+        if mm is not None: mm.close()
+        os.close(fd)
+
+def hash_file_md5(file_path, cancel_event=None):
+    file_size = os.path.getsize(file_path)
+    if file_size >= PIPELINED_MD5_MIN_BYTES:
+        return hash_file_md5_pipelined(file_path, file_size, cancel_event)
+    with open(open_sequential(file_path), 'rb', buffering=0) as f:
+        # 不使用 hashlib.file_digest：它同樣是 Python 層的 readinto 循環，且緩衝區只有 256 KiB；
+        # 這裡以 1 MiB 起、對齊文件系統建議塊大小的無緩衝讀取，減少系統調用與解釋器往返
+        block_size = getattr(os.fstat(f.fileno()), 'st_blksize', 0) or MD5_READ_BLOCK_SIZE
+        block_size = -(-MD5_READ_BLOCK_SIZE // block_size) * block_size
+        hash_md5 = new_md5()
+        buf = bytearray(block_size)
+        view = memoryview(buf)
+        while (n := f.readinto(buf)):
+            if cancel_event is not None and cancel_event.is_set(): return None
+            hash_md5.update(view[:n])
+        return hash_md5.hexdigest()
+
+def calculate_tree_md5(file_path, workers=None, segment_size=TREE_HASH_SEGMENT_SIZE, cancel_event=None):
+    # 將文件分段後在多個線程中並行計算各段 MD5 (hashlib 處理大塊數據時會釋放 GIL)，再對各段摘要取 MD5；
+    # 結果與 Drive 的 md5Checksum 不相容，只用於在本地判斷內容是否改變
+    workers = workers or os.cpu_count() or 1
+    file_size = os.path.getsize(file_path)
+    if file_size == 0: return new_md5().hexdigest()
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            def hash_segment(offset):
+                # 已取消時跳過尚未開始的分段，讓線程池盡快結束
+                if cancel_event is not None and cancel_event.is_set(): return None
+                segment_md5 = new_md5()
+                segment_md5.update(view[offset:offset + segment_size])
+                return segment_md5.digest()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                segment_digests = list(pool.map(hash_segment, range(0, file_size, segment_size)))
+        finally:
+            view.release()
+    if cancel_event is not None and cancel_event.is_set(): return None
+    tree_md5 = new_md5()
+    tree_md5.update(b"".join(segment_digests))
+    return tree_md5.hexdigest()
+
+def open_hash_cache():
+    conn = sqlite3.connect(os.path.join(get_default_cache_dir(), HASH_CACHE_FILENAME), timeout=5)
+    conn.execute("CREATE TABLE IF NOT EXISTS h(key TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, md5 TEXT, tree_md5 TEXT)")
+    return conn
+
+def hash_cache_key(file_path, st):
+    # 以 (設備, inode) 作為鍵，重命名或經符號連結訪問也能命中；不提供 inode 的文件系統 (st_ino 為 0) 退回使用真實路徑
+    if st.st_ino: return f"{st.st_dev}:{st.st_ino}"
+    return os.path.realpath(file_path)
+
+def lookup_cached_md5(file_path, st):
+    try:
+        with closing(open_hash_cache()) as conn:
+            row = conn.execute("SELECT size, mtime, md5, tree_md5 FROM h WHERE key = ?", (hash_cache_key(file_path, st),)).fetchone()
+    except sqlite3.Error:
+        return None
+    return dict(zip(('size', 'mtime_ns', 'md5', 'tree_md5'), row)) if row else None
+
+def store_cached_md5(file_path, st, digest, tree_md5=None):
+    try:
+        with closing(open_hash_cache()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO h VALUES (?, ?, ?, ?, ?)", (hash_cache_key(file_path, st), st.st_size, st.st_mtime_ns, digest, tree_md5))
+    except sqlite3.Error:
+        pass
+
+def calculate_md5(file_path, cancel_event=None, tree_fingerprint=False):
+    # 以 (大小, 修改時間) 驗證 SQLite 中緩存的 MD5，文件未變動時直接返回，避免整個文件重新讀取；
+    # 單行查詢不必像 JSON 緩存那樣隨已同步文件數增長而整體讀寫
+    st = os.stat(file_path)
+    entry = lookup_cached_md5(file_path, st)
+    if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+        return entry['md5']
+
+    # 可選: 大文件僅修改時間改變 (如 touch、重新檢出) 時，以並行的分段指紋確認內容未變，沿用緩存的 MD5
+    tree_md5 = None
+    if tree_fingerprint and st.st_size >= PIPELINED_MD5_MIN_BYTES:
+        if cancel_event is not None and cancel_event.is_set(): return None
+        tree_md5 = calculate_tree_md5(file_path, cancel_event=cancel_event)
+        if tree_md5 is None: return None
+        if entry and entry['size'] == st.st_size and entry['tree_md5'] == tree_md5:
+            store_cached_md5(file_path, st, entry['md5'], tree_md5)
+            return entry['md5']
+
+    digest = hash_file_md5(file_path, cancel_event)
+    if digest is None: return None
+    store_cached_md5(file_path, st, digest, tree_md5)
+    return digest
+
+def guess_mime_type(file_path):
+    mime_type = EXT_TO_MIME_TYPE.get(os.path.splitext(file_path)[1].lower())
+    return mime_type if mime_type else mimetypes.guess_type(file_path)[0]
+
+def escape_query_value(value):
+    # Drive 查詢語法中字符串以單引號包裹，需轉義反斜線與單引號，否則如 "John's Notes" 的名稱會導致 400 錯誤
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+def create_folder(service, folder_name, console, parent_id='root'):
+    folder_metadata = {'name': folder_name, 'mimeType': FOLDER_MIME_TYPE, 'parents': [parent_id]}
     folder = service.files().create(body=folder_metadata, fields='id').execute()
     console.log(f"  - 在雲端創建了新資料夾: '[bold cyan]{folder_name}[/bold cyan]'")
     return folder.get('id')
 
-def get_remote_path_id(service, remote_path_parts, console):
-    current_parent_id = 'root'
-    for part in remote_path_parts:
-        if part:
-            current_parent_id = get_or_create_folder_id(service, part, console, current_parent_id)
-    return current_parent_id
-
-def find_remote_file(service, file_name, parent_folder_id):
-    base_name, _ = os.path.splitext(file_name)
-    query = f"(name = '{file_name}' or name = '{base_name}') and '{parent_folder_id}' in parents and trashed = false"
-    response = service.files().list(q=query, spaces='drive', fields='files(id, name, md5Checksum, modifiedTime, webViewLink, mimeType)', pageSize=10).execute()
+def get_remote_path_id(service, remote_path_parts, console, use_cache=True):
+    from googleapiclient.errors import HttpError
+
+    parts = [part for part in remote_path_parts if part]
+    if not parts: return 'root', False
+
+    # 資料夾 ID 在多次同步間保持穩定，以 "父ID/名稱" 為鍵緩存在本地，命中時無需任何請求；
+    # 部分命中時從最深的已緩存資料夾繼續解析
+    cache_path = os.path.join(get_default_config_dir(), FOLDER_CACHE_FILENAME)
+    cache = load_json_cache(cache_path)
+    start_index, start_id = 0, None
+    if use_cache:
+        for part in parts:
+            child_id = cache.get(f"{start_id or 'root'}/{part}")
+            if child_id is None: break
+            start_index, start_id = start_index + 1, child_id
+        else:
+            return start_id, True
+    remaining_parts = parts[start_index:]
+
+    # 一次查詢取回剩餘路徑上所有同名資料夾；從 root 開始時與 root 的真實 ID 放在同一個批次請求中。
+    # 之後在本地根據 parents 重建鏈條，N 次往返縮減為 1 次
+    name_clause = ' or '.join(f"name = '{escape_query_value(part)}'" for part in dict.fromkeys(remaining_parts))
+    query = f"{FOLDER_QUERY} and ({name_clause})"
+    fields = 'nextPageToken, files(id, name, parents)'
+    if start_id is None:
+        responses = {}
+        def collect(request_id, response, exception):
+            if exception is not None: raise exception
+            responses[request_id] = response
+        batch = service.new_batch_http_request(callback=collect)
+        batch.add(service.files().get(fileId='root', fields='id'), request_id='root')
+        batch.add(service.files().list(q=query, spaces='drive', fields=fields, pageSize=1000), request_id='folders')
+        batch.execute()
+        current_parent_id = responses['root'].get('id')
+        response = responses['folders']
+    else:
+        current_parent_id = start_id
+        response = service.files().list(q=query, spaces='drive', fields=fields, pageSize=1000).execute()
+
+    folders = response.get('files', [])
+    page_token = response.get('nextPageToken')
+    while page_token:
+        response = service.files().list(q=query, spaces='drive', fields=fields, pageSize=1000, pageToken=page_token).execute()
+        folders.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+
+    parent_key = start_id or 'root'
+    try:
+        for part in remaining_parts:
+            child_id = next((f.get('id') for f in folders if f.get('name') == part and current_parent_id in f.get('parents', [])), None)
+            if child_id is None:
+                # 缺失的尾段互相依賴，只能依次創建
+                child_id = create_folder(service, part, console, current_parent_id)
+            cache[f"{parent_key}/{part}"] = child_id
+            current_parent_id = parent_key = child_id
+    except HttpError as error:
+        # 緩存的上層資料夾已不存在，放棄緩存從 root 重新解析
+        if start_id is None or error.resp.status != 404: raise
+        return get_remote_path_id(service, remote_path_parts, console, use_cache=False)
+    save_json_cache(cache_path, cache)
+    # 返回值的第二項表示鏈條中是否使用了未經驗證的緩存 ID
+    return current_parent_id, start_id is not None
+
+class StaleFolderError(Exception):
+    pass
+
+def find_remote_file(service, file_name, parent_folder_id, verify_parent=False):
+    base_name, extension = os.path.splitext(file_name)
+    # 無副檔名時兩個名稱相同，只保留一個條件
+    name_clause = ' or '.join(f"name = '{escape_query_value(name)}'" for name in dict.fromkeys([file_name, base_name]))
+    query = f"({name_clause}) and '{parent_folder_id}' in parents and trashed = false"
+    list_request = service.files().list(q=query, spaces='drive', fields='files(id, name, md5Checksum, modifiedTime, webViewLink, mimeType, size, appProperties)', pageSize=10)
+    if verify_parent:
+        # 父資料夾 ID 來自緩存時，在同一個批次請求中確認它未被刪除或移入垃圾桶 (含上層資料夾被移入垃圾桶)，不增加往返
+        responses = {}
+        def collect(request_id, response, exception):
+            if request_id == 'parent' and exception is not None and exception.resp.status == 404:
+                raise StaleFolderError(parent_folder_id)
+            if exception is not None: raise exception
+            responses[request_id] = response
+        batch = service.new_batch_http_request(callback=collect)
+        batch.add(service.files().get(fileId=parent_folder_id, fields='trashed'), request_id='parent')
+        batch.add(list_request, request_id='files')
+        batch.execute()
+        if responses['parent'].get('trashed'): raise StaleFolderError(parent_folder_id)
+        response = responses['files']
+    else:
+        response = list_request.execute()
     files = response.get('files', [])
     if not files: return None
     if len(files) > 1:
+        # 由本工具上傳的文件帶有 orig_ext，可精確區分同名的不同格式文件
+        orig_ext = extension.lstrip('.')
+        for f in files:
+            if f.get('appProperties', {}).get('orig_ext') == orig_ext: return f
         for f in files:
             if 'google-apps' in f.get('mimeType', ''): return f
     return files[0]
 
+@functools.lru_cache(maxsize=None)
 def get_default_config_dir():
-    if platform.system() == "Darwin": return os.path.expanduser('~/Library/Mobile Documents/com~apple~CloudDocs/AppConfig/drive-sync')
+    if PLATFORM_SYSTEM == "Darwin": return os.path.expanduser('~/Library/Mobile Documents/com~apple~CloudDocs/AppConfig/drive-sync')
     else: return os.path.expanduser('~/.config/drive-sync')
 
-def create_drive_file(service, local_file_path, file_name, parent_folder_id, console):
-    media = MediaFileUpload(local_file_path, resumable=True)
-    file_metadata = {'name': file_name, 'parents': [parent_folder_id]}
-    if media.mimetype() in MIME_TYPE_MAP:
-        file_metadata['mimeType'] = MIME_TYPE_MAP[media.mimetype()]
+@functools.lru_cache(maxsize=None)
+def get_default_cache_dir():
+    # 哈希緩存以 (設備, inode) 為鍵，只對本機有意義；不放在 macOS 經 iCloud 同步的設定目錄中，
+    # 以免 SQLite 數據庫及其日誌文件被同步而產生衝突副本或損壞
+    if PLATFORM_SYSTEM == "Darwin": return os.path.expanduser('~/Library/Caches/drive-sync')
+    else: return os.path.expanduser('~/.cache/drive-sync')
+
+class _HashingStream:
+    # 包裝上傳使用的文件對象，在 googleapiclient 讀取數據時順帶更新 MD5
+    def __init__(self, fd, media):
+        self._fd = fd
+        self._media = media
+
+    def read(self, size=-1):
+        begin = self._fd.tell()
+        data = self._fd.read(size)
+        self._media.feed_md5(begin, data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._fd, name)
+
+class HashingUploadMixin:
+    # 上傳過程中邊讀邊計算 MD5，上傳完成後即可與雲端返回的 md5Checksum 比對，無需預先完整讀取文件
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.local_stat = os.fstat(self._fd.fileno())
+        self._md5 = new_md5()
+        self._hashed_bytes = 0
+
+    def feed_md5(self, begin, data):
+        # 可續傳上傳重試時可能重複讀取同一區段，只累加尚未計入的部分
+        if begin <= self._hashed_bytes < begin + len(data):
+            self._md5.update(memoryview(data)[self._hashed_bytes - begin:])
+            self._hashed_bytes = begin + len(data)
+
+    def getbytes(self, begin, length):
+        data = super().getbytes(begin, length)
+        self.feed_md5(begin, data)
+        return data
+
+    def stream(self):
+        return _HashingStream(super().stream(), self)
+
+    def md5_hexdigest(self):
+        if self._hashed_bytes != self.size(): return None
+        return self._md5.hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def get_hashing_media_upload_class():
+    from googleapiclient.http import MediaFileUpload
+    return type('HashingMediaFileUpload', (HashingUploadMixin, MediaFileUpload), {})
+
+def build_media_upload(local_file_path, chunk_size_mb=DEFAULT_UPLOAD_CHUNK_SIZE_MB, mimetype=None):
+    HashingMediaFileUpload = get_hashing_media_upload_class()
+    # 小文件使用單次 multipart 上傳，省去可續傳上傳的握手往返
+    if os.path.getsize(local_file_path) < SIMPLE_UPLOAD_MAX_BYTES:
+        return HashingMediaFileUpload(local_file_path, mimetype=mimetype, resumable=False)
+    # 較大的分塊可減少可續傳上傳中每個 PUT 的往返次數
+    return HashingMediaFileUpload(local_file_path, mimetype=mimetype, chunksize=chunk_size_mb * 1024 * 1024, resumable=True)
+
+def verify_uploaded_md5(media, uploaded_file, local_file_path, console):
+    local_md5 = media.md5_hexdigest()
+    remote_md5 = uploaded_file.get('md5Checksum')
+    # 轉換為原生Google格式的文件沒有 md5Checksum，無法校驗
+    if not local_md5 or not remote_md5: return
+    if local_md5 != remote_md5:
+        print_error(console, f"  - [bold red]警告:[/bold red] 上傳後 MD5 校驗不一致 (本地: {local_md5} / 雲端: {remote_md5})")
+        return
+    store_cached_md5(local_file_path, media.local_stat, local_md5)
+    return local_md5
+
+def build_app_properties(file_name, local_stat, local_md5=None):
+    # 記錄上傳時本地文件的狀態；之後若本地 stat 未變且雲端 md5Checksum 仍等於 localMd5，即可判定兩邊一致而無需計算 MD5
+    app_properties = {
+        'orig_ext': os.path.splitext(file_name)[1].lstrip('.'),
+        'localMtime': str(local_stat.st_mtime_ns),
+        'localSize': str(local_stat.st_size),
+    }
+    if local_md5: app_properties['localMd5'] = local_md5
+    return app_properties
+
+def is_unchanged_since_sync(remote_file, local_stat):
+    app_properties = remote_file.get('appProperties', {})
+    remote_md5 = remote_file.get('md5Checksum')
+    return bool(remote_md5) and app_properties.get('localMd5') == remote_md5 \
+        and app_properties.get('localMtime') == str(local_stat.st_mtime_ns) \
+        and app_properties.get('localSize') == str(local_stat.st_size)
+
+def finished_result(future):
+    # 只取已在背景完成的結果，不等待也不拋出異常
+    if future.done() and not future.cancelled() and future.exception() is None:
+        return future.result()
+    return None
+
+def record_verified_md5(service, file_id, app_properties, verified_md5):
+    # appProperties 隨上傳一併送出時 MD5 往往尚未算完 (大文件尤甚)；以上傳時邊讀邊算、且已與雲端核對的 MD5 補寫 localMd5，
+    # 之後的同步才能走免哈希的捷徑。只是一次小的元數據請求，失敗時不影響本次同步結果
+    from googleapiclient.errors import HttpError
+
+    if not verified_md5 or 'localMd5' in app_properties: return
+    try:
+        service.files().update(fileId=file_id, body={'appProperties': {'localMd5': verified_md5}}, fields='id').execute()
+    except HttpError:
+        pass
+
+def create_drive_file(service, local_file_path, file_name, parent_folder_id, console, chunk_size_mb=DEFAULT_UPLOAD_CHUNK_SIZE_MB, mimetype=None, local_md5=None):
+    if mimetype is None:
+        mimetype = guess_mime_type(local_file_path)
+    media = build_media_upload(local_file_path, chunk_size_mb, mimetype)
+    file_metadata = {'name': file_name, 'parents': [parent_folder_id], 'appProperties': build_app_properties(file_name, media.local_stat, local_md5)}
+    native_mime_type = MIME_TYPE_MAP.get(mimetype)
+    if native_mime_type:
+        file_metadata['mimeType'] = native_mime_type
         console.log(f"  - 請求將文件轉換為: [bold yellow]{file_metadata['mimeType']}[/bold yellow]")
-    uploaded_file = service.files().create(body=file_metadata, media_body=media, fields='id, webViewLink').execute()
+    uploaded_file = service.files().create(body=file_metadata, media_body=media, fields='id, webViewLink, md5Checksum').execute()
+    verified_md5 = verify_uploaded_md5(media, uploaded_file, local_file_path, console)
+    record_verified_md5(service, uploaded_file.get('id'), file_metadata['appProperties'], verified_md5)
     return uploaded_file
 
+class WriteBehindFile:
+    # 下載時在背景線程寫入磁碟，讓下一個分塊的網絡接收與上一個分塊的寫入重疊；
+    # 最多只保留一個未完成的寫入，寫入錯誤會在下一次 write 或 close 時拋出。
+    # 傳入 hasher 時在同一背景線程中順帶更新摘要，下載完成後無需再讀一遍文件
+    def __init__(self, path, mode='wb', hasher=None):
+        self._fh = io.FileIO(path, mode)
+        self._hasher = hasher
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+    def _write_all(self, data):
+        view = memoryview(data)
+        if self._hasher is not None:
+            self._hasher.update(view)
+        while view:
+            view = view[self._fh.write(view):]
+
+    def _wait(self):
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def write(self, data):
+        self._wait()
+        self._pending = self._pool.submit(self._write_all, data)
+        return len(data)
+
+    def close(self):
+        try:
+            self._wait()
+        finally:
+            self._pool.shutdown()
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def download_remote_file(request, local_file_path, remote_file, resumable, console, status):
+    from googleapiclient.http import MediaIoBaseDownload
+
+    # 先下載到 .part 臨時文件，完成後再 os.replace，中途中斷不會損壞本地文件；
+    # .meta 記錄遠端文件版本，下次同步時若版本未變則通過 Range 請求從斷點繼續
+    part_path = local_file_path + '.part'
+    meta_path = part_path + '.meta'
+    resume_key = {'id': remote_file.get('id'), 'modifiedTime': remote_file.get('modifiedTime'), 'md5Checksum': remote_file.get('md5Checksum')}
+    resume_from = 0
+    if resumable and os.path.exists(part_path) and load_json_cache(meta_path) == resume_key:
+        resume_from = os.path.getsize(part_path)
+        console.log(f"  - 檢測到未完成的下載，從第 {resume_from} 字節繼續...")
+    if resumable:
+        save_json_cache(meta_path, resume_key)
+
+    # 邊寫邊計算 MD5，完成後與 md5Checksum 比對；續傳時先補算已下載部分的摘要
+    remote_md5 = remote_file.get('md5Checksum')
+    download_md5 = new_md5() if remote_md5 else None
+    if download_md5 is not None and resume_from:
+        with open(part_path, 'rb', buffering=0) as part_file:
+            buf = bytearray(MD5_READ_BLOCK_SIZE)
+            view = memoryview(buf)
+            while (n := part_file.readinto(buf)):
+                download_md5.update(view[:n])
+
+    remote_size = int(remote_file.get('size', -1))
+    if resumable and (resume_from == 0 or resume_from < remote_size):
+        # 二進制文件以單個串流 GET 下載並按 8 MiB 塊寫入，取代 MediaIoBaseDownload 每塊一次的 Range 請求，
+        # 也避免 httplib2 將整個分塊 (默認 100 MiB) 緩存在內存中；設置連接/讀取超時，連接停滯時報錯而非無限等待
+        from google.auth.transport.requests import AuthorizedSession
+
+        session = AuthorizedSession(request.http.credentials)
+        headers = {'Range': f'bytes={resume_from}-'} if resume_from else {}
+        with closing(session), session.get(request.uri, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            if resume_from and response.status_code != 206:
+                # 伺服器未接受 Range 請求，從頭開始下載
+                resume_from = 0
+                download_md5 = new_md5() if remote_md5 else None
+            received = resume_from
+            with WriteBehindFile(part_path, 'ab' if resume_from else 'wb', download_md5) as fh:
+                for block in response.iter_content(chunk_size=DOWNLOAD_BLOCK_SIZE):
+                    fh.write(block)
+                    received += len(block)
+                    if remote_size > 0:
+                        status.update(f"[bold green]下載進度: {int(received * 100 / remote_size)}%")
+    elif not resumable:
+        # 原生Google文件的導出不支持 Range 請求，仍使用 MediaIoBaseDownload
+        with WriteBehindFile(part_path, 'wb', download_md5) as fh:
+            downloader = MediaIoBaseDownload(fh, request)
+            done = False
+            while not done: 
+                # 使用一个不会冲突的新变量名 download_progress
+                download_progress, done = downloader.next_chunk()
+                # 使用 download_progress 获取进度，并用原始的 status 对象来更新显示
+                if download_progress:
+                    status.update(f"[bold green]下載進度: {int(download_progress.progress() * 100)}%")
+
+    if download_md5 is not None and download_md5.hexdigest() != remote_md5:
+        # 校驗失敗時丟棄臨時文件，保留原本地文件不變，下次同步重新完整下載
+        for path in (part_path, meta_path):
+            if os.path.exists(path): os.remove(path)
+        raise ValueError(f"下載文件 MD5 校驗失敗 (本地: {download_md5.hexdigest()} / 雲端: {remote_md5})")
+
+    os.replace(part_path, local_file_path)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    if download_md5 is not None:
+        store_cached_md5(local_file_path, os.stat(local_file_path), remote_md5)
+
 def open_in_browser(url, console):
     if not url:
-        console.print("  - [bold red]警告:[/bold red] 未提供有效的URL，無法打開瀏覽器。")
+        print_error(console, "  - [bold red]警告:[/bold red] 未提供有效的URL，無法打開瀏覽器。")
         return
     console.log(f"  - 正在嘗試在預設瀏覽器中打開連結...")
     try:
         webbrowser.open(url, new=2)
     except Exception as e:
-        console.print(f"  - [bold red]錯誤:[/bold red] 自動打開瀏覽器失敗: {e}")
+        print_error(console, f"  - [bold red]錯誤:[/bold red] 自動打開瀏覽器失敗: {e}")
 
 # --- 主執行函數 ---
 
 def main():
-    console = Console()
-
     parser = argparse.ArgumentParser(description="智能同步本地文件至 Google Drive", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument("local_path", help="要同步的本地文件路徑")
     parser.add_argument("--base-path", default="/FileSync", help="雲端儲存的基礎路徑")
@@ -127,46 +658,70 @@ def main():
     parser.add_argument("--credentials-path", help="指定 credentials.json 文件的路徑")
     parser.add_argument("--token-path", help="指定 token.json 文件的路徑")
     parser.add_argument("--open", action='store_true', help="同步完成後，在預設瀏覽器中自動打開文件連結")
+    parser.add_argument("--quiet", action='store_true', help="僅輸出錯誤與警告信息")
+    parser.add_argument("--tree-fingerprint", action='store_true', help="為大文件額外緩存並行計算的分段指紋，僅修改時間改變時可跳過 MD5 重新計算")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_UPLOAD_CHUNK_SIZE_MB, help="可續傳上傳的分塊大小 (MiB)")
     args = parser.parse_args()
+    # quiet 模式下 rich 直接丟棄輸出，不再渲染進度與比對信息
+    console = Console(quiet=args.quiet)
+    if args.chunk_size <= 0:
+        print_error(console, f"[bold red]錯誤:[/bold red] --chunk-size 必須為正整數 -> '{args.chunk_size}'")
+        return
 
     local_file_path = os.path.abspath(args.local_path)
     if not os.path.isfile(local_file_path):
-        console.print(f"[bold red]錯誤:[/bold red] 提供的路徑不是一個有效的文件 -> '{local_file_path}'")
+        print_error(console, f"[bold red]錯誤:[/bold red] 提供的路徑不是一個有效的文件 -> '{local_file_path}'")
         return
 
     default_config_dir = get_default_config_dir()
     os.makedirs(default_config_dir, exist_ok=True)
+    os.makedirs(get_default_cache_dir(), exist_ok=True)
     credentials_path = args.credentials_path or os.path.join(default_config_dir, 'credentials.json')
     token_path = args.token_path or os.path.join(default_config_dir, 'token.json')
     
     device_name = socket.gethostname()
-    path_without_drive = os.path.splitdrive(local_file_path)[1]
-    path_parts = path_without_drive.strip(os.path.sep).split(os.path.sep)
-    if platform.system() == "Windows":
-        drive = os.path.splitdrive(local_file_path)[0].strip(":\\")
-        path_parts.insert(0, drive)
-    base_path_parts = args.base_path.strip('/').split('/')
+    # PurePath.parts 一次完成拆分；Windows 上首段為盤符 (如 'C:\\')，POSIX 上為 '/'，去掉分隔符後非空才保留
+    local_parts = pathlib.PurePath(local_file_path).parts
+    anchor = local_parts[0].strip(':\\/')
+    path_parts = ([anchor] if anchor else []) + list(local_parts[1:])
+    base_path_parts = [part for part in args.base_path.split('/') if part]
     remote_folder_path_parts = base_path_parts + [device_name] + path_parts[:-1]
     file_name = path_parts[-1]
+    # 只猜測一次 MIME 類型，在所有上傳路徑中複用
+    local_mime_type = guess_mime_type(local_file_path)
     
     info_table = Table(show_header=False, box=None, padding=(0, 1))
     info_table.add_row("[bold]本地文件:[/bold]", f"[green]{local_file_path}[/green]")
     info_table.add_row("[bold]雲端路徑:[/bold]", f"[cyan]/{'/'.join(remote_folder_path_parts)}/{file_name}[/cyan]")
     console.print(Panel(info_table, title="同步任務", border_style="blue", expand=False))
     
+    from googleapiclient.errors import HttpError
+
+    # 本地 MD5 與授權、資料夾解析、雲端搜索互不依賴，一開始就在背景線程計算，讓磁碟讀取與所有網絡往返重疊
+    hash_pool = ThreadPoolExecutor(max_workers=1)
+    md5_cancel = threading.Event()
+    md5_future = hash_pool.submit(calculate_md5, local_file_path, md5_cancel, args.tree_fingerprint)
     try:
         service = get_drive_service(credentials_path, token_path, console)
         
         with console.status("[bold green]正在初始化...", spinner="dots") as status:
             status.update("[bold green]正在檢查並創建雲端資料夾結構...")
-            parent_folder_id = get_remote_path_id(service, remote_folder_path_parts, console)
+            parent_folder_id, folder_from_cache = get_remote_path_id(service, remote_folder_path_parts, console)
             status.update(f"[bold green]正在雲端智能搜索文件 '[yellow]{file_name}[/yellow]'...")
-            remote_file = find_remote_file(service, file_name, parent_folder_id)
+            try:
+                remote_file = find_remote_file(service, file_name, parent_folder_id, verify_parent=folder_from_cache)
+            except StaleFolderError:
+                console.log("  - 緩存的資料夾 ID 已失效，重新解析雲端路徑...")
+                parent_folder_id, _ = get_remote_path_id(service, remote_folder_path_parts, console, use_cache=False)
+                remote_file = find_remote_file(service, file_name, parent_folder_id)
 
         if not remote_file:
+            # 上傳時會邊讀邊計算 MD5，無需等待背景哈希；其結果在上傳後寫入 appProperties.localMd5
+            md5_cancel.set()
+            md5_future.cancel()
             console.print("\n[yellow]遠端文件不存在，執行上傳操作。[/yellow]")
             with console.status("[bold green]文件上傳中...", spinner="earth"):
-                uploaded_file = create_drive_file(service, local_file_path, file_name, parent_folder_id, console)
+                uploaded_file = create_drive_file(service, local_file_path, file_name, parent_folder_id, console, args.chunk_size, local_mime_type, finished_result(md5_future))
             
             file_link = uploaded_file.get('webViewLink')
             summary = Text.assemble(("上傳成功！\n", "bold green"), ("編輯連結: ", "default"), (file_link, "cyan underline"))
@@ -178,14 +733,33 @@ def main():
         is_native_google_doc = 'google-apps' in remote_file.get('mimeType', '')
         remote_file_link = remote_file.get('webViewLink')
 
+        local_md5 = None
+        if not is_native_google_doc and is_unchanged_since_sync(remote_file, os.stat(local_file_path)):
+            # 本地文件自上次同步後未被修改，且雲端內容仍是當時上傳的版本
+            md5_cancel.set()
+            md5_future.cancel()
+            summary = Text.assemble(("文件自上次同步後兩端均未改變，無需同步。\n", "bold green"), ("編輯連結: ", "default"), (remote_file_link, "cyan underline"))
+            console.print(Panel(summary, title="✅ 操作完成", border_style="green"))
+            if args.open: open_in_browser(remote_file_link, console)
+            return
+
         if is_native_google_doc:
+            md5_cancel.set()
+            md5_future.cancel()
             console.print("  - [magenta]檢測到雲端文件為原生Google格式，將跳過MD5比對。[/magenta]")
             proceed_to_time_comparison = True
+        elif 'size' in remote_file and int(remote_file['size']) != os.path.getsize(local_file_path):
+            # 大小不同則內容必然不同，無需等待 MD5 計算完成
+            md5_cancel.set()
+            md5_future.cancel()
+            console.print("  - [magenta]本地與雲端文件大小不同，將跳過MD5比對。[/magenta]")
+            proceed_to_time_comparison = True
         else:
             with console.status("[bold green]正在計算本地文件 MD5..."):
-                local_md5 = calculate_md5(local_file_path)
+                local_md5 = md5_future.result()
             remote_md5 = remote_file.get('md5Checksum')
-            console.print(f"  - 本地文件 MD5: [yellow]{local_md5}[/yellow]\n  - 雲端文件 MD5: [yellow]{remote_md5}[/yellow]")
+            if not console.quiet:
+                console.print(f"  - 本地文件 MD5: [yellow]{local_md5}[/yellow]\n  - 雲端文件 MD5: [yellow]{remote_md5}[/yellow]")
             if local_md5 == remote_md5:
                 summary = Text.assemble(("文件內容完全一致，無需同步。\n", "bold green"), ("編輯連結: ", "default"), (remote_file_link, "cyan underline"))
                 console.print(Panel(summary, title="✅ 操作完成", border_style="green"))
@@ -198,7 +772,8 @@ def main():
             console.print("\n[bold]正在比較修改時間...[/bold]")
             local_mtime_utc = datetime.fromtimestamp(os.path.getmtime(local_file_path), tz=timezone.utc)
             remote_mtime_utc = datetime.fromisoformat(remote_file.get('modifiedTime').replace('Z', '+00:00'))
-            console.print(f"  - 本地文件 (UTC): [yellow]{local_mtime_utc}[/yellow]\n  - 雲端文件 (UTC): [yellow]{remote_mtime_utc}[/yellow]")
+            if not console.quiet:
+                console.print(f"  - 本地文件 (UTC): [yellow]{local_mtime_utc}[/yellow]\n  - 雲端文件 (UTC): [yellow]{remote_mtime_utc}[/yellow]")
 
             effective_direction = args.sync_direction
             if effective_direction == 'auto':
@@ -211,20 +786,23 @@ def main():
 
             if effective_direction == 'local-to-remote' and local_mtime_utc > remote_mtime_utc:
                 if is_native_google_doc:
-                    with console.status("[bold green]正在更新原生Google文件(刪除後重建)...", spinner="bouncingBar") as status:
-                        status.update("[bold red]  - 正在刪除舊文件...")
-                        service.files().delete(fileId=remote_file.get('id')).execute()
-                        status.update("[bold green]  - 正在上傳新版本...")
-                        updated_file = create_drive_file(service, local_file_path, file_name, parent_folder_id, console)
+                    # 原地更新並轉換格式，保留原文件的 ID、共享權限與評論
+                    with console.status("[bold green]正在更新原生Google文件...", spinner="bouncingBar"):
+                        media = build_media_upload(local_file_path, args.chunk_size, local_mime_type)
+                        target_mime_type = MIME_TYPE_MAP.get(local_mime_type, remote_file.get('mimeType'))
+                        updated_file = service.files().update(fileId=remote_file.get('id'), body={'mimeType': target_mime_type}, media_body=media, fields='webViewLink').execute()
                     
                     file_link = updated_file.get('webViewLink')
-                    summary = Text.assemble(("更新成功！文件已被重建。\n", "bold green"), ("新的編輯連結: ", "default"), (file_link, "cyan underline"))
+                    summary = Text.assemble(("更新成功！原生Google文件已原地更新。\n", "bold green"), ("編輯連結: ", "default"), (file_link, "cyan underline"))
                     console.print(Panel(summary, title="✅ 操作完成", border_style="green"))
                     if args.open: open_in_browser(file_link, console)
                 else:
                     with console.status("[bold green]文件更新中...", spinner="earth"):
-                        media = MediaFileUpload(local_file_path, resumable=True)
-                        updated_file = service.files().update(fileId=remote_file.get('id'), media_body=media, fields='id, webViewLink').execute()
+                        media = build_media_upload(local_file_path, args.chunk_size, local_mime_type)
+                        app_properties = build_app_properties(file_name, media.local_stat, local_md5 or finished_result(md5_future))
+                        updated_file = service.files().update(fileId=remote_file.get('id'), body={'appProperties': app_properties}, media_body=media, fields='webViewLink, md5Checksum').execute()
+                        verified_md5 = verify_uploaded_md5(media, updated_file, local_file_path, console)
+                        record_verified_md5(service, remote_file.get('id'), app_properties, verified_md5)
                     
                     file_link = updated_file.get('webViewLink')
                     summary = Text.assemble(("更新成功！\n", "bold green"), ("編輯連結: ", "default"), (file_link, "cyan underline"))
@@ -237,22 +815,15 @@ def main():
                         remote_mime_type = remote_file.get('mimeType')
                         export_mime_type = GOOGLE_DOC_EXPORT_MAP.get(remote_mime_type)
                         if not export_mime_type:
-                            console.print(f"\n[bold red]❌ 下載失敗！[/bold red] 不支持將 '{remote_mime_type}' 導出為此類文件。")
+                            print_error(console, f"\n[bold red]❌ 下載失敗！[/bold red] 不支持將 '{remote_mime_type}' 導出為此類文件。")
                             return
                         status.update(f"[bold green]檢測到原生Google格式，將從 '{remote_mime_type}' 導出為 '{export_mime_type}'...")
                         request = service.files().export_media(fileId=remote_file.get('id'), mimeType=export_mime_type)
                     else:
                         request = service.files().get_media(fileId=remote_file.get('id'))
                     
-                    with io.FileIO(local_file_path, 'wb') as fh:
-                        downloader = MediaIoBaseDownload(fh, request)
-                        done = False
-                        while not done: 
-                            # 使用一个不会冲突的新变量名 download_progress
-                            download_progress, done = downloader.next_chunk()
-                            # 使用 download_progress 获取进度，并用原始的 status 对象来更新显示
-                            if download_progress:
-                                status.update(f"[bold green]下載進度: {int(download_progress.progress() * 100)}%")
+                    # 導出的原生Google文件不支持 Range 請求，無法斷點續傳
+                    download_remote_file(request, local_file_path, remote_file, not is_native_google_doc, console, status)
                 
                 summary = Text.assemble(("下載成功！本地文件已被更新。\n", "bold green"), ("雲端文件連結: ", "default"), (remote_file_link, "cyan underline"))
                 console.print(Panel(summary, title="✅ 操作完成", border_style="green"))
@@ -263,11 +834,15 @@ def main():
                 if args.open: open_in_browser(remote_file_link, console)
 
     except HttpError as error:
-        console.print(Panel(f"[bold]API 錯誤詳情:[/bold]\n{error}", title="❌ API 錯誤", border_style="bold red"))
+        print_error(console, Panel(f"[bold]API 錯誤詳情:[/bold]\n{error}", title="❌ API 錯誤", border_style="bold red"))
     except FileNotFoundError:
-        console.print(Panel(f"本地文件未找到 -> '{local_file_path}'", title="❌ 文件錯誤", border_style="bold red"))
+        print_error(console, Panel(f"本地文件未找到 -> '{local_file_path}'", title="❌ 文件錯誤", border_style="bold red"))
     except Exception as e:
-        console.print(Panel(f"[bold]未知錯誤詳情:[/bold]\n{e}", title="❌ 未知錯誤", border_style="bold red"))
+        print_error(console, Panel(f"[bold]未知錯誤詳情:[/bold]\n{e}", title="❌ 未知錯誤", border_style="bold red"))
+    finally:
+        # 提前結束 (包括出錯) 時中止仍在進行的哈希計算，避免程序退出時等待背景線程
+        md5_cancel.set()
+        hash_pool.shutdown(wait=False)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file